@@ -22,21 +22,24 @@ v = verifitmodel.VerifitModel(path=datapath,
                               freqs=[250,500,750,1000,1500,2000,3000,4000], 
                               test_type='test-box')
 
-# Parse Verifit .xml data
+# Parse Verifit .xml data. Unchanged session files are loaded 
+# from the per-file cache in ~/.cache/verifit.
 v.get_data()
 
 # Calculate difference from targets
 v.get_diffs()
 
 # Make plots
-pm.estat_rear_diffs(v.measured_long, save='n')
+# Organize data into multilevel index and curves once for all plots
+measured = pm.format_data(v.measured_long)
+measured_groups = pm.group_data(measured)
+diffs = pm.format_data(v.diffs.dropna(subset='measured-target'))
+diffs_groups = pm.group_data(diffs)
 
-# pm.NAL_rear_diffs(v.measured_long, save='n')
+pm.estat_rear_diffs(measured, measured_groups, save='n')
 
-# pm.NAL_rear_NAL_targets(
-#     data=v.diffs.dropna(subset='measured-target'), 
-#     save='n')
+# pm.NAL_rear_diffs(measured, measured_groups, save='n')
 
-# pm.estat_rear_NAL_targets(
-#     data=v.diffs.dropna(subset='measured-target'), 
-#     save='n')
+# pm.NAL_rear_NAL_targets(diffs, diffs_groups, save='n')
+
+# pm.estat_rear_NAL_targets(diffs, diffs_groups, save='n')
\ No newline at end of file
@@ -1,11 +1,19 @@
 import pandas as pd
 
+# Items not needed for analysis
+DROP_ITEMS = ['ScreenOne abnormal behavior','ScreenOne additional information','ScreenFour other information','ScreenFive other information','ScreenSixMemorySelected','ScreenThree listening goal', 'ScreenTwo location','ScreenTwo other information']
+
 datapath = r'C:\Users\MooTra\OneDrive - Starkey\Documents\Projects\ABA\aba_data_utf8.csv'
-data = pd.read_csv(datapath)
+data = pd.read_csv(
+    datapath,
+    usecols=['Filenames', 'SubID', 'Items', 'Answer'],
+    dtype={'Items': 'category'}
+)
 
-data = data.pivot(index=['Filenames','SubID'], columns='Items', values='Answer')
+# Filter unneeded items before pivoting so they are never materialized
+data = data[~data['Items'].isin(DROP_ITEMS)]
 
-data.drop(['ScreenOne abnormal behavior','ScreenOne additional information','ScreenFour other information','ScreenFive other information','ScreenSixMemorySelected','ScreenThree listening goal', 'ScreenTwo location','ScreenTwo other information'], axis=1, inplace=True)
+data = data.pivot(index=['Filenames','SubID'], columns='Items', values='Answer')
 
 m3 = data[data['ScreenSix memory preferred'].isin(['M3 slightly preferred', 'M3 preferred'])] 
 m3['Listening Scenario'].value_counts()
@@ -1,12 +1,15 @@
 from models import verifitmodel
-import xml.etree.ElementTree as ET
+# Import XML parser: prefer lxml (C libxml2), fall back to stdlib
+try:
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+import numpy as np
 from matplotlib import pyplot as plt
 
 
 fpath = './P0888_BestFit.xml'
 #fpath = r'C:\Users\MooTra\OneDrive - Starkey\Documents\Projects\EM Music\EdgeModeMusic\LT_EMM_Music_2024_04_03.xml'
-tree = ET.parse(fpath)
-root = tree.getroot()
 
 
 """ Other things to test for:
@@ -18,22 +21,41 @@ root = tree.getroot()
         -plots
 """
 
-def parse(side, test_num):
-    """ Return values from Verifit XML for the 
-        supplied arguments.
+def parse(fpath):
+    """ Return on-ear SPL curves and 12th-octave frequencies
+        from Verifit XML in a single streaming pass.
+
+        Curves are keyed by (side, test_num). Only the first 
+        matching curve is kept, as with find().
     """
-    for val in root.iter('test'):
-        try:
-            if val.attrib['side'] == side:
-                for child in val.iter('data'):
-                    if child.attrib['name'] == f'test{test_num}_on-ear' \
-                    and child.attrib['yunit'] == 'dBspl' \
-                    and child.attrib['internal'] == f"map_rearspl{test_num}":
-                        to_list = child.text.split(" ")
-                        to_numeric = [float(x) for x in to_list]
-                        return to_numeric
-        except:
-            pass
+    # Map (side, name, internal) to curve key
+    wanted = {(side, f'test{n}_on-ear', f'map_rearspl{n}'): (side, n)
+              for n in range(1, 5) for side in ('left', 'right')}
+    curves = {}
+    freqs = None
+
+    ctx = ET.iterparse(fpath, events=('end',))
+    for _, elem in ctx:
+        if elem.tag != 'test':
+            continue
+        side = elem.get('side')
+        if elem.get('name') == 'frequencies':
+            freqs = elem.find('data[@name="12ths"]').text
+        elif side is not None:
+            for child in elem.iterfind('data'):
+                key = wanted.get(
+                    (side, child.get('name'), child.get('internal')))
+                if key and key not in curves and child.get('yunit') == 'dBspl':
+                    # Verifit pads unused points with '_'; read as NaN
+                    curves[key] = np.fromstring(
+                        child.text.replace('_', 'nan'), sep=' ', dtype=np.float64)
+
+        # Free processed elements
+        elem.clear()
+
+    return curves, freqs
+
+curves, freqs_12ths = parse(fpath)
 
 sides = ['left', 'right']
 plot_curve = []
@@ -41,13 +63,12 @@ for ii in range(1, 5):
     for side in sides:
         print(f"\nSide: {side}")
         print(f"Curve number: {ii}")
-        plot_curve.append(parse(side, ii))
-        print(parse(side, ii))
+        curve = curves.get((side, ii))
+        print(curve)
+        plot_curve.append(curve)
 
 # Get 12th octave freqs
-vals = root.find('test[@name="frequencies"]/data[@name="12ths"]').text
-to_nums = vals.split(' ')
-twelfs = [int(float(x)) for x in to_nums]
+twelfs = np.fromstring(freqs_12ths, sep=' ', dtype=np.float64).astype(np.int32)
 print(f"\n12th-octave freqs: {twelfs}")
 
 plt.plot(plot_curve)
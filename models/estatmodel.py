@@ -17,13 +17,90 @@ from tkinter import filedialog
 
 # Import system packages
 import os
+import re
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
 # Import data science packages
 import numpy as np
 import pandas as pd
 
 
+#############
+# Functions #
+#############
+# Form factor tokens in device info, in order of precedence
+_FF_MAP = {
+    'MicroRIC': 'MRIC',
+    #' RIC': 'RIC',
+    ' RIC312': 'RIC312',
+    'ITE': 'ITE',
+    'ITC': 'ITC',
+    'CIC': 'CIC',
+    'IIC': 'IIC'
+}
+_FF_RE = re.compile('|'.join(_FF_MAP))
+
+def _get_form_factor(df):
+    """ Tech toolbox data export files are organized differently 
+        based on form factor. This function returns the form 
+        factor from the device info in the first row. 
+    """
+    device_info = str(df.iloc[0,0])
+    # Scan once for all tokens, then pick by precedence
+    found = set(_FF_RE.findall(device_info))
+    return next((ff for token, ff in _FF_MAP.items() if token in found), "OTHER")
+
+
+def _process_one(file, freqs):
+    """ Read e-STAT targets at FREQS from a single tech toolbox 
+        .csv file. Returns a dict of column values. 
+
+        Module level (and free of instance state) so it can run 
+        in a worker process.
+    """
+    print(f"estatmodel: Processing {file}")
+    # Get filename
+    filename = os.path.basename(file)[:-4]
+
+    # Read device info from the first row only to get 
+    # form factor
+    df = pd.read_csv(file, header=None, nrows=1)
+    form_factor = _get_form_factor(df)
+
+    # Read typed target values from rows 20 and below to 
+    # cut off header information
+    data = pd.read_csv(
+        file,
+        header=None,
+        skiprows=20,
+        usecols=[0, 1, 2],
+        names=['freq', 'left', 'right'],
+        dtype={'freq': 'float64', 'left': 'float32', 'right': 'float32'},
+        engine='c'
+    )
+    data['freq'] = data['freq'].astype('int16')
+
+    # Round estat target values
+    data[['left', 'right']] = data[['left', 'right']].round(1)
+
+    # Subset by desired frequencies
+    data = data[data['freq'].isin(freqs)]
+
+    # Report desired frequencies missing from the file
+    missing = sorted(freqs.difference(data['freq'].tolist()))
+    if missing:
+        print(f"estatmodel: No target data for {missing} Hz in {filename}")
+
+    return {
+        'filename': filename,
+        'form_factor': form_factor,
+        'freq': data['freq'].values,
+        'left': data['left'].values,
+        'right': data['right'].values
+    }
+
+
 #########
 # BEGIN #
 #########
@@ -44,6 +121,8 @@ class EstatModel:
         # Check for frequencies        
         if freqs:
             self.freqs = freqs
+            # Reused to subset every file by frequency
+            self._freq_set = frozenset(freqs)
         else:
             raise AttributeError
 
@@ -55,32 +134,16 @@ class EstatModel:
         # print('-' * 60 + '\n')
 
 
-    def _get_form_factor(self, df):
-        """ Tech toolbox data export files are organized differently 
-            based on form factor. This function assigns the header 
-            row (-1) and starting target column by form factor. 
-        """
-        device_info = str(df.iloc[0,0])
-        if "MicroRIC" in device_info:
-            self.form_factor = "MRIC"
-        #elif " RIC" in device_info:
-        #    self.form_factor = "RIC"
-        elif " RIC312" in device_info:
-            self.form_factor = "RIC312"
-        elif "ITE" in device_info:
-            self.form_factor = "ITE"
-        elif "ITC" in device_info:
-            self.form_factor = "ITC"
-        elif "CIC" in device_info:
-            self.form_factor = "CIC"
-        elif "IIC" in device_info:
-            self.form_factor = "IIC"
-        else:
-            self.form_factor = "OTHER"
+    def get_targets(self, workers=1):
+        """ Create e-STAT prescribed targets dataframe
 
+            Frequencies are stored as int16 and targets as 
+            float32; do not assume float64 downstream.
 
-    def get_targets(self):
-        """ Create e-STAT prescribed targets dataframe
+            Files are read in parallel across WORKERS processes 
+            when WORKERS > 1. On Windows, calling scripts must 
+            guard their entry point with 
+            if __name__ == '__main__'.
         """
         # Display to console
         msg = "Pulling eSTAT Data"
@@ -89,66 +152,46 @@ class EstatModel:
         print(msg)
         print('-' * len(msg))
 
-        df_list = []
-        for file in self.files:
-            print(f"estatmodel: Processing {file}")
-            # Get filename
-            filename = os.path.basename(file)[:-4]
-
-            # Read in .csv file as dataframe          
-            df = pd.read_csv(file, header=None)
-
-            # Get header row, starting target column, 
-            # and form factor
-            self._get_form_factor(df)
-
-            # Truncate df to rows 20 and below to cut off header information
-            data = df.iloc[20:,0:3].copy()
-
-            # Rename columns
-            data.columns = ['freq', 'left', 'right']
-
-            # Change data type to numeric for entire df
-            data = data.apply(pd.to_numeric, errors='ignore')
-
-            # Round estat target values
-            data[['left', 'right']] = data[['left', 'right']].apply(np.round, decimals=1)
-
-            # Set frequency column as index
-            data = data.set_index(['freq'])
-
-            # Subset by desired frequencies
-            data = data.loc[self.freqs]
-
-            # Convert freq index to column
-            data.reset_index(inplace=True)
-
-            # Insert subject number from file name
-            data.insert(loc=0, column='filename', value=filename)
-
-            # Add form factor column
-            data.insert(loc=1, column='form_factor', value=self.form_factor)
-
-            # Append df to list
-            df_list.append(data)
-
-        self.estat_targets = pd.concat(df_list)
+        # Read each file
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                results = list(ex.map(
+                    _process_one, self.files, [self._freq_set] * len(self.files)))
+        else:
+            results = [_process_one(file, self._freq_set) for file in self.files]
+
+        # Empty lists to hold column values across files
+        fname_arr = []
+        ff_arr = []
+        for result in results:
+            fname_arr.extend([result['filename']] * len(result['freq']))
+            ff_arr.extend([result['form_factor']] * len(result['freq']))
+
+        # Build dataframe once from all files
+        self.estat_targets = pd.DataFrame({
+            'filename': fname_arr,
+            'data': 'estat',
+            'form_factor': ff_arr,
+            'freq': np.concatenate([r['freq'] for r in results]),
+            'left': np.concatenate([r['left'] for r in results]),
+            'right': np.concatenate([r['right'] for r in results])
+        })
         #self.estat_targets['form_factor'] = self.estat_targets['form_factor'].str.upper()
-        self.estat_targets.insert(loc=1, column='data', value='estat')
-        self.estat_targets.reset_index(drop=True, inplace=True)
         print("estatmodel: Done")
-        print(f"estatmodel: Records processed: {len(df_list)}")
+        print(f"estatmodel: Records processed: {len(results)}")
         print('-' * len(msg))
 
 
     def long_format(self):
-        self.estat_targets_long = pd.melt(self.estat_targets, 
-            id_vars=['filename', 'data', 'form_factor', 'freq'], 
-            value_vars=list(self.estat_targets.columns[4:]))
-
-        self.estat_targets_long.rename(columns={
-            'variable': 'side',
-            'value': 'estat_target'
-            }, 
-            inplace=True
+        """ Create long format targets with one row per side. 
+        """
+        self.estat_targets_long = (
+            self.estat_targets
+            .set_index(['filename', 'data', 'form_factor', 'freq'])[['left', 'right']]
+            .rename_axis(columns='side')
+            .stack(dropna=False)
+            .reset_index(name='estat_target')
         )
+        self.estat_targets_long['side'] = self.estat_targets_long['side'].astype('category')
+        self.estat_targets_long = self.estat_targets_long.astype(
+            {'estat_target': 'float32'})
\ No newline at end of file
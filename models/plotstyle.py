@@ -0,0 +1,27 @@
+""" Plot style shared by the Verifit and poster models.
+"""
+
+###########
+# Imports #
+###########
+import functools
+
+import matplotlib.pyplot as plt
+
+
+#############
+# Functions #
+#############
+def styled(rc, style='seaborn-v0_8'):
+    """ Return a decorator that runs a plotting function with
+        matplotlib STYLE and the rcParams in RC. The previous
+        rcParams are restored afterwards, so each module's plots
+        keep their own font sizes.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with plt.style.context(style), plt.rc_context(rc):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -9,54 +9,68 @@ import pandas as pd
 import numpy as np
 
 import matplotlib.pyplot as plt
-from matplotlib import rcParams
-rcParams.update({'figure.autolayout': True})
+
+from .plotstyle import styled
 
 
 ######################
 # Plotting Functions #
 ######################
+# Poster plot font sizes
+_RC = {
+    'font.size': 20, #16
+    'axes.titlesize': 18, #14
+    'axes.labelsize': 18, #14
+    'xtick.labelsize': 16, #14
+    'ytick.labelsize': 16 #14
+}
+
+
 def _create_empty_plot(nrows, ncols, freqs):
     """ Create empty plotting space with NROWS number of rows,
         and NCOLS number of columns.
     """
-    # Set style
-    plt.style.use('seaborn-v0_8')
-
-    plt.rc('font', size=20) #16
-    plt.rc('axes', titlesize=18) #14
-    plt.rc('axes', labelsize=18) #14
-    plt.rc('xtick', labelsize=16) #14
-    plt.rc('ytick', labelsize=16) #14
-
     # Create ticks and labels
     kHz = [x/1000 for x in freqs]
 
-    # Create figure and axes
-    fig, axs = plt.subplots(nrows=nrows, ncols=ncols, squeeze=False)
-
-    for col in range(0,ncols):
-        for row in range(0, nrows):
-            axs[row, col].set(
-                #title=side + ': ' + conds[counter].capitalize(),
-                #ylabel="Difference (dB SPL)",
-                xlim=([min(freqs)+20, max(freqs)+30]),
-                xscale='log',
-                xticks=freqs,
-                xticklabels=kHz,
-                ylim=([-5, 5]),
-                yticks=[-5, 0, 5],
-                #yticklabels=['-10', '', '0', '', '10']
-                yticklabels=['-5', '0', '5']
-            )
+    # Create figure and axes with shared x and y axes
+    fig, axs = plt.subplots(nrows=nrows, ncols=ncols, squeeze=False,
+                            sharex=True, sharey=True, constrained_layout=True)
+
+    # Settings on one axis propagate to all shared axes
+    axs[0, 0].set(
+        #title=side + ': ' + conds[counter].capitalize(),
+        #ylabel="Difference (dB SPL)",
+        xlim=([min(freqs)+20, max(freqs)+30]),
+        xscale='log',
+        xticks=freqs,
+        xticklabels=kHz,
+        ylim=([-5, 5]),
+        yticks=[-5, 0, 5],
+        #yticklabels=['-10', '', '0', '', '10']
+        yticklabels=['-5', '0', '5']
+    )
 
     return fig, axs
 
 
-def _format_data(data):
-    data = data.copy()
-    data[['hl', 'device', 'formula']] = data['filename'].str.split('_', expand=True)
-    data.drop(['filename'], axis=1, inplace=True)
+def format_data(data):
+    """ Organize long-format Verifit data into a multilevel index 
+        of hearing loss, device, formula and condition. 
+
+        Call once and pass the result to each plotting function.
+    """
+    # Split each unique filename once, then expand to every row 
+    # by category code
+    filenames = data['filename'].astype('category')
+    parts = pd.Series(filenames.cat.categories).str.split('_', expand=True)
+    splits = parts.take(filenames.cat.codes)
+    splits.index = data.index
+    splits.columns = ['hl', 'device', 'formula']
+
+    # Build a new frame from the split filename and remaining 
+    # columns, leaving the original untouched
+    data = pd.concat([splits, data.drop(columns=['filename'])], axis=1)
     data.set_index(['hl', 'device', 'formula', 'condition'], drop=True, inplace=True)
 
     # Change value column to float
@@ -74,13 +88,35 @@ def _format_data(data):
     return data
 
 
-def estat_rear_diffs(data, save=None):
+def group_data(df):
+    """ Return a dict of column arrays for each curve in data 
+        from format_data, keyed by (hl, device, formula, condition).
+
+        Build once and pass to each plotting function to avoid
+        repeated multilevel index lookups.
+    """
+    # Curves are grouped by the index from format_data
+    if df.index.nlevels != 4:
+        raise ValueError(
+            "postermodel: Expected data from format_data "
+            "(hl, device, formula, condition index); "
+            "call format_data first")
+
+    groups = {}
+    for key, grp in df.groupby(level=[0, 1, 2, 3], sort=False, observed=True):
+        groups[key] = {col: grp[col].to_numpy() for col in grp.columns}
+    return groups
+
+
+@styled(_RC)
+def estat_rear_diffs(df, groups=None, save=None):
     """ Plot difference in REAR: eSTAT 2.0 - eSTAT 1.0.
+        Expects data from format_data and, optionally, 
+        curves from group_data.
     """
-    # Copy the data to avoid changes to the original
-    data = data.copy()
-    # Organize data into mulitlevel index
-    df = _format_data(data=data)
+    # Look up curves by index key
+    if groups is None:
+        groups = group_data(df)
 
     # Define frequencies
     desired_freqs = list(df['frequency'].unique())
@@ -95,9 +131,9 @@ def estat_rear_diffs(data, save=None):
     # Calculate differences and plot
     for ii, hl in enumerate(hls):
         # Calculate the differences for estat1 and estat2
-        estat1 = list(df.loc[(hl, 'Evolv', 'eSTAT', 'left65')]['value'])
-        estat2 = list(df.loc[(hl, 'G23', 'eSTAT2', 'left65')]['value'])
-        estat_diffs = [np.round(np.subtract(x2, x1), 1) for (x2, x1) in zip(estat2, estat1)]
+        estat1 = groups[(hl, 'Evolv', 'eSTAT', 'left65')]['value']
+        estat2 = groups[(hl, 'G23', 'eSTAT2', 'left65')]['value']
+        estat_diffs = np.round(estat2 - estat1, 1)
 
         # Plot
         ax[ii,0].plot(desired_freqs, estat_diffs)
@@ -114,14 +150,16 @@ def estat_rear_diffs(data, save=None):
     plt.show()
 
 
-def NAL_rear_diffs(data, save=None):
+@styled(_RC)
+def NAL_rear_diffs(df, groups=None, save=None):
     """ Plot difference in REAR across devices when both 
         were set to NAL-NL2. 
+        Expects data from format_data and, optionally, 
+        curves from group_data.
     """
-    # Copy the data to avoid changes to the original
-    data = data.copy()
-    # Organize data into mulitlevel index
-    df = _format_data(data=data)
+    # Look up curves by index key
+    if groups is None:
+        groups = group_data(df)
 
     # Define frequencies
     desired_freqs = list(df['frequency'].unique())
@@ -136,9 +174,9 @@ def NAL_rear_diffs(data, save=None):
     # Calculate differences and plot
     for ii, hl in enumerate(hls):
         # Calculate the differences for estat1 and estat2
-        estat1 = list(df.loc[(hl, 'Evolv', 'NL2', 'left65')]['value'])
-        estat2 = list(df.loc[(hl, 'G23', 'NL2', 'left65')]['value'])
-        estat_diffs = [np.round(np.subtract(x2, x1), 1) for (x2, x1) in zip(estat2, estat1)]
+        estat1 = groups[(hl, 'Evolv', 'NL2', 'left65')]['value']
+        estat2 = groups[(hl, 'G23', 'NL2', 'left65')]['value']
+        estat_diffs = np.round(estat2 - estat1, 1)
 
         # Plot
         ax[ii,0].plot(desired_freqs, estat_diffs)
@@ -155,14 +193,16 @@ def NAL_rear_diffs(data, save=None):
     plt.show()
 
 
-def estat_rear_NAL_targets(data, save=None):
+@styled(_RC)
+def estat_rear_NAL_targets(df, groups=None, save=None):
     """ Plot eSTAT 1 (right columns) and 2 (left column) REAR
         minus NAL-NL2 targets.
+        Expects data from format_data and, optionally, 
+        curves from group_data.
     """
-    # Copy the data to avoid changes to the original
-    data = data.copy()
-    # Organize data into mulitlevel index
-    df = _format_data(data=data)
+    # Look up curves by index key
+    if groups is None:
+        groups = group_data(df)
 
     # Define frequencies
     desired_freqs = list(df['frequency'].unique())
@@ -177,8 +217,7 @@ def estat_rear_NAL_targets(data, save=None):
     # Calculate eSTAT 1 differences and plot
     for ii, hl in enumerate(hls):
         # Calculate the differences for estat1 and estat2
-        e1_nl2_diff = list(
-            df.loc[(hl, 'Evolv', 'eSTAT', 'left65')]['measured-target'])
+        e1_nl2_diff = groups[(hl, 'Evolv', 'eSTAT', 'left65')]['measured-target']
 
         # Plot
         ax[ii,0].plot(desired_freqs, e1_nl2_diff)
@@ -192,8 +231,7 @@ def estat_rear_NAL_targets(data, save=None):
     # Calculate eSTAT 2 differences and plot
     for ii, hl in enumerate(hls):
         # Calculate the differences for estat1 and estat2
-        e2_nl2_diff = list(
-            df.loc[(hl, 'G23', 'eSTAT2', 'left65')]['measured-target'])
+        e2_nl2_diff = groups[(hl, 'G23', 'eSTAT2', 'left65')]['measured-target']
 
         # Plot
         ax[ii,1].plot(desired_freqs, e2_nl2_diff)
@@ -215,14 +253,16 @@ def estat_rear_NAL_targets(data, save=None):
     plt.show()
 
 
-def NAL_rear_NAL_targets(data, save=None):
+@styled(_RC)
+def NAL_rear_NAL_targets(df, groups=None, save=None):
     """ Plot NAL-NL2 REAR minus NAL-NL2 targets for
         Evolv (right column) and Genesis (left column).
+        Expects data from format_data and, optionally, 
+        curves from group_data.
     """
-    # Copy the data to avoid changes to the original
-    data = data.copy()
-    # Organize data into mulitlevel index
-    df = _format_data(data=data)
+    # Look up curves by index key
+    if groups is None:
+        groups = group_data(df)
 
     # Define frequencies
     desired_freqs = list(df['frequency'].unique())
@@ -237,8 +277,7 @@ def NAL_rear_NAL_targets(data, save=None):
     # Calculate eSTAT 1 differences and plot
     for ii, hl in enumerate(hls):
         # Calculate the differences for estat1 and estat2
-        e1_nl2_diff = list(
-            df.loc[(hl, 'Evolv', 'NL2', 'left65')]['measured-target'])
+        e1_nl2_diff = groups[(hl, 'Evolv', 'NL2', 'left65')]['measured-target']
 
         # Plot
         ax[ii,0].plot(desired_freqs, e1_nl2_diff)
@@ -249,7 +288,7 @@ def NAL_rear_NAL_targets(data, save=None):
     # Calculate eSTAT 2 differences and plot
     for ii, hl in enumerate(hls):
         # Calculate the differences for estat1 and estat2
-        e2_nl2_diff = list(df.loc[(hl, 'G23', 'NL2', 'left65')]['measured-target'])
+        e2_nl2_diff = groups[(hl, 'G23', 'NL2', 'left65')]['measured-target']
 
         # Plot
         ax[ii,1].plot(desired_freqs, e2_nl2_diff)
@@ -18,20 +18,161 @@
 # Import data science packages
 import numpy as np
 import pandas as pd
-import xml.etree.ElementTree as ET
+
+# Import XML parser: prefer lxml (C libxml2), fall back to stdlib
+try:
+    from lxml import etree as ET
+    # Drop whitespace-only text between elements while parsing
+    _PARSE_OPTIONS = {'remove_blank_text': True}
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _PARSE_OPTIONS = {}
 
 import matplotlib.pyplot as plt
-from matplotlib import rcParams
-rcParams.update({'figure.autolayout': True})
 
 # Import system packages
 import os
+import pickle
+import hashlib
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Import GUI packages
 import tkinter as tk
 from tkinter import filedialog
 
+# Import custom modules
+from .plotstyle import styled
+
+
+#############
+# Functions #
+#############
+# Version of the per-file cache contents. Bump this when the 
+# parsed results change, so old cache files are parsed again.
+_CACHE_VERSION = 2
+
+def _to_array(text, dtype=np.float32):
+    """ Convert a space-separated Verifit value string to a
+        float array (float32 by default). Verifit pads unused 
+        points with '_', which become NaN.
+    """
+    return np.fromstring(text.replace('_', 'nan'), dtype=dtype, sep=' ')
+
+
+def _match_curves(index, levels, sides, test_type, dtype=np.float32):
+    """ Get speech curve SPL arrays for each level and side, and 
+        match each curve to its test number by comparing the raw 
+        value text against the numbered curve data.
+
+        Returns a dict of SPL arrays keyed by side + level, and a 
+        dict of (target field, test name) keyed by stim_level.
+    """
+    # Hold measured SPL values
+    spl_dict = {}
+    # Match target test number with stim_level
+    key_dict = {}
+
+    # Map numbered curve text to its test number for each side, 
+    # so each level is matched with one dict lookup. Later test 
+    # numbers win if two curves are identical.
+    curves = {side: {} for side in sides}
+    for side in sides:
+        for num in [1,2,3,4]: # Possible test numbers
+            text = index.get((side, 'internal', f'map_{test_type}spl{num}'))
+            if text is not None:
+                curves[side][text] = num
+
+    for item in levels:
+        for side in sides:
+            # Try to get spl values for each level and side
+            vals = index.get((side, 'stim_level', item))
+            if vals is None:
+                # No SPL data exists for this test number
+                print(f"verifitmodel: No SPL data for {side + item[-2:]}")
+                continue
+
+            # Add values to SPL dict
+            spl_dict[side + item[-2:]] = _to_array(vals, dtype)
+
+            # Get speech curve test number (to match to target and 
+            # sii test number)
+            # Look for exact match of SPL values referencing 
+            # curve data by number
+            num = curves[side].get(vals)
+            if num is not None:
+                key_dict[item] = (f'map_{test_type}_targetspl{num}', f'test{num}')
+                print(f"verifitmodel: Found SPL data for: {side + item[-2:]}")
+
+    return spl_dict, key_dict
+
+
+# Parser for this worker process, built by _init_worker
+_worker = None
+
+def _init_worker(settings):
+    """ Build a parser from SETTINGS once in each worker process, 
+        so parsed data and plots are never sent to workers.
+    """
+    global _worker
+    _worker = VerifitModel.__new__(VerifitModel)
+    _worker.__dict__.update(settings)
+
+
+def _parse_one(file):
+    """ Parse a single file with this worker process's parser. 
+    """
+    return _worker._load_or_parse(file)
+
+
+def _diff_stats(diffs):
+    """ Return the arithmetic mean and RMS of measured-target 
+        differences for each condition and frequency, from a 
+        single groupby over the differences and their squares.
+    """
+    diff = diffs['measured-target'].to_numpy()
+    stats = (
+        diffs[['condition', 'frequency']]
+        .assign(mean=diff, sq=diff * diff)
+        .groupby(['condition', 'frequency'], observed=True)[['mean', 'sq']]
+        .mean()
+    )
+    stats['rms'] = np.sqrt(stats.pop('sq'))
+    return stats
+
+
+# Verifit plot font sizes
+_RC = {
+    'font.size': 16,
+    'axes.titlesize': 14,
+    'axes.labelsize': 14,
+    'xtick.labelsize': 14,
+    'ytick.labelsize': 14
+}
+
+
+def _stack_blocks(blocks):
+    """ Build one DataFrame from a list of per-file dicts of 
+        column arrays. Columns missing from a file are filled 
+        with NaN. filename and data are stored as categoricals.
+    """
+    # Keep columns in order of first appearance
+    columns = list(dict.fromkeys(col for block in blocks for col in block))
+    sizes = [len(block['filename']) for block in blocks]
+
+    data = {}
+    for col in columns:
+        data[col] = np.concatenate([
+            block[col] if col in block else np.full(size, np.nan, dtype=np.float32)
+            for block, size in zip(blocks, sizes)
+        ])
+
+    # Store repeated file names and data types once
+    for col in ['filename', 'data']:
+        if col in data:
+            data[col] = pd.Categorical(data[col])
+    return pd.DataFrame(data)
+
 
 #########
 # BEGIN #
@@ -44,6 +185,12 @@ class VerifitModel:
             KWARGS:
                 test_type: Either 'on-ear' or 'test-box'
                 freqs: The desired frequencies, if different from audiometric
+                dtype: Float type for SPL values (default float32; 
+                    pass np.float64 for full precision)
+                use_cache: Reuse parsed results for unchanged files 
+                    (default True)
+                cache_dir: Directory for parsed results (default 
+                    ~/.cache/verifit)
         """
         #############
         # Constants #
@@ -55,6 +202,9 @@ class VerifitModel:
         # List of sides
         self.SIDES = ['left', 'right']
 
+        # Data attributes used to look up values
+        self.INDEX_ATTRS = ['stim_level', 'internal', 'name', 'stim_type']
+
 
         ########
         # Init #
@@ -89,100 +239,166 @@ class VerifitModel:
         else:
             self.desired_freqs = [250, 500, 750, 1000, 1500, 2000, 3000, 4000, 6000, 8000]
 
+        # Float type for SPL values
+        if 'dtype' in kwargs:
+            self.dtype = kwargs['dtype']
+        else:
+            self.dtype = np.float32
+
+        # Cache parsed results for unchanged files
+        if 'use_cache' in kwargs:
+            self.use_cache = kwargs['use_cache']
+        else:
+            self.use_cache = True
+
+        if 'cache_dir' in kwargs:
+            self.cache_dir = Path(kwargs['cache_dir'])
+        else:
+            self.cache_dir = Path.home() / '.cache' / 'verifit'
+
+        # desired_freqs, 12th octave freqs and desired_freqs 
+        # positions from the last parsed file
+        self._desired_idx = None
+
 
     #####################
     # General Functions #
     #####################
-    def _get_freqs(self, root):
+    def _parser_settings(self):
+        """ Return the attributes needed to parse session files, 
+            without any parsed data or plots.
+        """
+        attrs = ['LEVELS', 'SIDES', 'INDEX_ATTRS', 'test_type', 
+                 'desired_freqs', 'dtype', 'use_cache', 'cache_dir', 
+                 '_desired_idx']
+        return {attr: getattr(self, attr) for attr in attrs}
+
+
+    def _get_freqs(self, index):
         """ Pull 12th octave and audiometric frequencies from 
-            .xml file.
+            the session index. Returns the 12th octave freqs, the 
+            positions of desired_freqs within them, and the 
+            audiometric freqs.
 
             MEASURED SPLs: use 12th octave
             TARGET SPLs: use audiometric
         """
         # Get 12th octave freqs
-        freqs = root.find("./test[@name='frequencies']/data[@name='12ths']").text
-        freqs = freqs.split()
-        self.freqs_12oct = [int(float(freq)) for freq in freqs]
+        freqs = index[(None, 'name', '12ths')]
+        freqs_12oct = np.fromstring(freqs, sep=' ', dtype=np.float64).astype(np.int16)
+
+        # Positions of desired_freqs in the 12th octave freqs. 
+        # Verifit uses the same freqs in every file, so reuse the 
+        # last positions when both sets of freqs match.
+        desired = tuple(self.desired_freqs)
+        last = self._desired_idx
+        if (last is not None and last[0] == desired 
+                and np.array_equal(last[1], freqs_12oct)):
+            idx = last[2]
+        else:
+            # 12th octave freqs are in ascending order, so look up 
+            # each desired freq by binary search and keep exact hits
+            wanted = np.unique(np.asarray(self.desired_freqs))
+            pos = np.searchsorted(freqs_12oct, wanted)
+            found = pos < len(freqs_12oct)
+            found[found] = freqs_12oct[pos[found]] == wanted[found]
+            idx = pos[found]
+            self._desired_idx = (desired, freqs_12oct, idx)
 
         # Get audiometric freqs
-        freqs = root.find("./test[@name='frequencies']/data[@name='audiometric']").text
-        freqs = freqs.split()
-        freqs = [int(float(freq)) for freq in freqs]
-        self.freqs_audio = freqs[:-2]
+        freqs = index[(None, 'name', 'audiometric')]
+        freqs = np.fromstring(freqs, sep=' ', dtype=np.float64).astype(np.int16)
+        freqs_audio = freqs[:-2]
+
+        return freqs_12oct, idx, freqs_audio
+
+
+    def _index_session(self, file):
+        """ Stream a session file and map the text of every 
+            side-specific and frequency data element by 
+            (side, attribute, value), so later lookups are dict 
+            gets rather than tree searches.
+
+            Each top-level element is indexed and cleared as soon 
+            as it has been parsed, so no tree is held in memory.
+            Only the first match is kept, as with find().
+        """
+        context = ET.iterparse(file, events=('start', 'end'), **_PARSE_OPTIONS)
+        _, doc = next(context)
+
+        index = {}
+        depth = 0
+        for event, elem in context:
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+
+            # Index, then drop, each direct child of the document
+            if depth == 0:
+                doc.remove(elem)
+                # The frequencies test has no side; index it under None
+                side = elem.get('side')
+                if elem.tag == 'test' and (side or elem.get('name') == 'frequencies'):
+                    for data in elem.iter('data'):
+                        for attr in self.INDEX_ATTRS:
+                            value = data.get(attr)
+                            if value is not None:
+                                index.setdefault((side, attr, value), data.text)
+                elem.clear()
+
+        return index
 
 
     def rms(self, vals):
-        return np.sqrt(np.mean(np.square(vals)))
+        """ Root mean square of VALS. For grouped differences, 
+            use _diff_stats rather than applying this per group.
+        """
+        vals = np.asarray(vals, dtype=np.float64).ravel()
+        return np.sqrt(np.dot(vals, vals) / vals.size)
 
 
     ##########################
     # Data Parsing Functions #
     ##########################
-    def _get_measured_spls(self, root, filename):
+    def _get_measured_spls(self, index, filename, freqs, idx):
         """ Get measured SPL values AND determine test number
             to create a key to locate target and sii values
             in their respective methods.
+            Expects 12th octave freqs and desired positions 
+            from _get_freqs.
         """
-        # Hold measured SPL values
-        spl_dict = {}
-        # Match target test number with stim_level
-        key_dict = {}
-
-        # SPEECH CURVE #
-        for item in self.LEVELS:
-            for side in self.SIDES:
-                try:
-                    # Try to get spl values (as list) for each level and side
-                    vals = root.find(
-                        f"./test[@side='{side}']/data[@stim_level='{item}']"
-                    ).text
-                    # Add values to SPL dict
-                    spl_dict[side + item[-2:]] = vals.split()
-
-                    # Get speech curve test number (to match to target and 
-                    # sii test number)
-                    for num in [1,2,3,4]: # Possible test numbers
-                        try:
-                            # Look for exact match of SPL values referencing 
-                            # curve data by number
-                            if vals == root.find(f"./test[@side='{side}']/data[@internal='map_{self.test_type}spl{num}']").text:
-                                key_dict[item] = (f'map_{self.test_type}_targetspl{str(num)}', f'test{str(num)}')                                
-                                print(f"verifitmodel: Found SPL data for: {side + item[-2:]}")
-                        except AttributeError:
-                            # Current test number not a match for SPLs
-                            pass
-                except AttributeError:
-                    # No SPL data exists for this test number
-                    print(f"verifitmodel: No SPL data for {side + item[-2:]}")
+        # Speech curve SPLs and matching test numbers
+        spl_dict, key_dict = _match_curves(
+            index, self.LEVELS, self.SIDES, self.test_type, self.dtype)
 
         # MPO #
         for side in self.SIDES:
-            try:
-                vals = root.find(f"./test[@side='{side}']/data[@stim_type='mpo']").text
-                spl_dict[side + 'mpo'] = vals.split()
-            except AttributeError:
+            vals = index.get((side, 'stim_type', 'mpo'))
+            if vals is not None:
+                spl_dict[side + 'mpo'] = _to_array(vals, self.dtype)
+            else:
                 print(f"verifitmodel: No MPO data for {side} side")
-                #pass
-
-        # Create Data Frame #
-        spls = pd.DataFrame(spl_dict)
-        spls.insert(loc=0, column='frequency', value=self.freqs_12oct)
 
         # Just grab frequencies matching desired_freqs
-        spls = spls[spls['frequency'].isin(self.desired_freqs)]
+        n = len(idx)
 
-        # Add filename and data type columns
-        spls.insert(loc=0, column='filename', value=filename)
-        spls.insert(loc=1, column='data', value='measured')
-        spls.reset_index(drop=True, inplace=True)
+        # Create column arrays, with filename and data type first #
+        spls = {
+            'filename': np.full(n, filename, dtype=object),
+            'data': np.full(n, 'measured', dtype=object),
+            'frequency': freqs[idx]
+        }
+        for col, vals in spl_dict.items():
+            spls[col] = vals[idx]
 
         return spls, key_dict
 
 
-    def _get_target_spls(self, root, filename, test_key):
+    def _get_target_spls(self, index, filename, test_key, freqs):
         """ Get targets SPL values.
-            Expects key from _get_measured_spls. 
+            Expects key from _get_measured_spls and audiometric 
+            freqs from _get_freqs. 
         """
         # Hold target SPL values
         target_dict = {}
@@ -190,27 +406,25 @@ class VerifitModel:
         # Speech targets #
         for key, value in test_key.items():
             for side in self.SIDES:
-                try:
-                    vals = root.find(f"./test[@side='{side}']/data[@internal='{value[0]}']").text
-                    target_dict[side + key[-2:]] = vals.split()[:-2]
-                except AttributeError:
+                vals = index.get((side, 'internal', value[0]))
+                if vals is not None:
+                    target_dict[side + key[-2:]] = _to_array(vals, self.dtype)[:-2]
+                else:
                     print(f"verifitmodel: No target data for {key, value[0]} in {os.path.basename(filename)}")
 
-        # Create Data Frame #
-        targets = pd.DataFrame(target_dict)
-        targets.insert(loc=0, column='frequency', value=self.freqs_audio)
-
-        # Force data to numeric
-        targets.apply(pd.to_numeric, errors='ignore')
-
-        # Add filename and data type columns
-        targets.insert(loc=0, column='filename', value=filename)
-        targets.insert(loc=1, column='data', value='target')
+        # Create column arrays, with filename and data type first #
+        n = len(freqs)
+        targets = {
+            'filename': np.full(n, filename, dtype=object),
+            'data': np.full(n, 'target', dtype=object),
+            'frequency': freqs,
+            **target_dict
+        }
 
         return targets
 
 
-    def _get_aided_siis(self, root, filename, test_key):
+    def _get_aided_siis(self, index, filename, test_key):
         """ Get aided SII values. 
             Expects key from _get_measured_spls. 
         """
@@ -220,46 +434,128 @@ class VerifitModel:
         # Speech targets #
         for key, value in test_key.items():
             for side in self.SIDES:
-                try:
-                    # Change the field name based on test-type
-                    # because Verifit session files are inconsistent
-                    # and ridiculous.
-                    if self.test_type == 'sar':
-                        x = value[1] + '_testbox_meas_sii'
-                    elif self.test_type == 'rear':
-                        x=value[1] + '_on-ear_meas_sii'
-
-                    # Grab SII value from dict
-                    vals = root.find(f"./test[@side='{side}']/data[@name='{x}']").text
+                # Change the field name based on test-type
+                # because Verifit session files are inconsistent
+                # and ridiculous.
+                if self.test_type == 'sar':
+                    x = value[1] + '_testbox_meas_sii'
+                elif self.test_type == 'rear':
+                    x=value[1] + '_on-ear_meas_sii'
+
+                # Grab SII value from dict
+                vals = index.get((side, 'name', x))
+                if vals is not None:
                     sii_dict[side + key[-2:]] = float(vals)
-                except AttributeError:
+                else:
                     # Should really only see this if the dict 
                     # contains a test name that doesn't actually have data
                     # I.E. something went wrong.
                     print(f"verifitmodel: No aided SII data for {key, '->', value[1]} in {os.path.basename(filename)}")
 
-        # Create dataframe #
-        siis = pd.DataFrame([sii_dict])
+        # Create single-row column arrays, with filename and 
+        # data type first #
+        siis = {
+            'filename': np.array([filename], dtype=object),
+            'data': np.array(['aided_sii'], dtype=object)
+        }
+        for col, val in sii_dict.items():
+            siis[col] = np.array([val])
 
-        # Force data to numeric
-        siis.apply(pd.to_numeric, errors='ignore')
+        return siis
 
-        # Add filename and data type columns
-        siis.insert(loc=0, column='filename', value=filename)
-        siis.insert(loc=1, column='data', value='aided_sii')
 
-        return siis
+    def _parse_file(self, file):
+        """ Pull measured SPL, target SPL and aided SII column 
+            arrays from a single Verifit .xml file. Also returns 
+            the test number key for the file.
+        """
+        print(f"\nverifitmodel: Processing {file}")
+        # Index data values for lookup
+        index = self._index_session(file)
+
+        # Get frequencies
+        freqs_12oct, idx, freqs_audio = self._get_freqs(index)
+
+        # Get file name
+        filename = os.path.basename(file)[:-4]
+
+        # Get measured SPLs
+        spls, keys = self._get_measured_spls(index, filename, freqs_12oct, idx)
+
+        # Get target SPLs
+        targets = self._get_target_spls(index, filename, keys, freqs_audio)
+
+        # Get aided SIIs
+        siis = self._get_aided_siis(index, filename, keys)
+
+        return spls, targets, siis, keys
+
+
+    def _load_or_parse(self, file):
+        """ Return cached results for a Verifit .xml file, or 
+            parse it and cache the results in cache_dir.
+
+            The cache is keyed on the cache version, the file path, 
+            modification time and size, and the parsing options, so 
+            edited files or a different test type or frequency list 
+            are parsed again.
+        """
+        if not self.use_cache:
+            return self._parse_file(file)
+
+        stat = os.stat(file)
+        key = hashlib.blake2b(
+            f"{_CACHE_VERSION}:"
+            f"{Path(file).resolve()}:{stat.st_mtime}:{stat.st_size}:"
+            f"{self.test_type}:{list(self.desired_freqs)}:"
+            f"{np.dtype(self.dtype).name}".encode(),
+            digest_size=16
+        ).hexdigest()
+        cache = self.cache_dir / f'{key}.pkl'
+
+        # Use cached results if they exist for this file and options
+        if cache.exists():
+            try:
+                with open(cache, 'rb') as f:
+                    result = pickle.load(f)
+                print(f"\nverifitmodel: Loaded cached {file}")
+                return result
+            except Exception:
+                # Unreadable cache, e.g. truncated or written by 
+                # other numpy/pandas versions; parse the file again
+                pass
+
+        result = self._parse_file(file)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(cache, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            print(f"verifitmodel: Could not write cache for {file}")
+
+        return result
 
 
     ########################################
     # Pull Measured, Target and SII Values #
     ########################################
-    def get_data(self):
+    def get_data(self, workers=1, threads=False):
         """ Pull measured and target SPLs, as well as the aided SII
             from Verifit .xml file.
 
             Iterates over a list of file paths, and returns one 
             dataframe for each type of data in wide format. 
+
+            Files are parsed in parallel across WORKERS processes 
+            when WORKERS > 1. Each process parses whole files, so 
+            do not combine this with other multi-threaded work. 
+            On Windows, calling scripts must guard their entry 
+            point with if __name__ == '__main__'.
+
+            Set THREADS=True to use threads instead. lxml releases 
+            the GIL while parsing, so this avoids process start-up 
+            and pickling costs and needs no __main__ guard, but 
+            indexing each file still runs one thread at a time.
         """
         # Display to console
         msg = "Parsing Verifit Data"
@@ -268,41 +564,47 @@ class VerifitModel:
         print(msg)
         print('-' * len(msg))
 
-        # Empty lists to hold data frames
-        spl_dfs = []
-        target_dfs = []
-        sii_dfs = []
-
-        for file in self.files: 
-            print(f"\nverifitmodel: Processing {file}")
-            # Get XML tree structure and root
-            tree = ET.parse(file)
-            root = tree.getroot()
-
-            # Get frequencies
-            self._get_freqs(root)
-
-            # Get file name
-            filename = os.path.basename(file)[:-4]
-
-            # Get measured SPLs
-            df, self.keys = self._get_measured_spls(root, filename)
-            spl_dfs.append(df)
-
-            # Get target SPLs
-            df = self._get_target_spls(root, filename, self.keys)
-            target_dfs.append(df)
-
-            # Get aided SIIs
-            df = self._get_aided_siis(root, filename, self.keys)
-            sii_dfs.append(df)
+        # Parse each file
+        if workers > 1:
+            # Dispatch the largest files first so no big file is left 
+            # running alone at the end, then restore file order
+            order = sorted(range(len(self.files)), 
+                           key=lambda ii: os.path.getsize(self.files[ii]), 
+                           reverse=True)
+            files = [self.files[ii] for ii in order]
+            max_workers = max(1, min(workers, len(self.files)))
+            if threads:
+                pool = ThreadPoolExecutor(max_workers=max_workers)
+                parse = self._load_or_parse
+            else:
+                # Send only the parsing settings, once per process
+                pool = ProcessPoolExecutor(
+                    max_workers=max_workers, 
+                    initializer=_init_worker, 
+                    initargs=(self._parser_settings(),)
+                )
+                parse = _parse_one
 
-        # Concatenate dfs
-        self.measured = pd.concat(spl_dfs, ignore_index=True)
-        self.targets = pd.concat(target_dfs, ignore_index=True)
-        self.aided_sii = pd.concat(sii_dfs, ignore_index=True)
+            results = [None] * len(self.files)
+            with pool as ex:
+                for ii, result in zip(order, ex.map(parse, files, chunksize=1)):
+                    results[ii] = result
+        else:
+            results = [self._load_or_parse(file) for file in self.files]
+
+        # Split per-file results into column arrays for each dataframe
+        spl_blocks = [result[0] for result in results]
+        target_blocks = [result[1] for result in results]
+        sii_blocks = [result[2] for result in results]
+        if results:
+            self.keys = results[-1][3]
+
+        # Build each dataframe once from all files
+        self.measured = _stack_blocks(spl_blocks)
+        self.targets = _stack_blocks(target_blocks)
+        self.aided_sii = _stack_blocks(sii_blocks)
         print("\nverifitmodel: Done")
-        print(f"verifitmodel: Records processed: {len(spl_dfs)}")
+        print(f"verifitmodel: Records processed: {len(spl_blocks)}")
         print('-' * len(msg))
 
 
@@ -320,6 +622,8 @@ class VerifitModel:
                 value_vars=list(self.measured.columns[3:])
             )
             self.measured_long.rename(columns={'variable': 'condition'}, inplace=True)
+            self.measured_long = self.measured_long.astype(
+                {'filename': 'category', 'condition': 'category'})
         except AttributeError:
             print("verifitmodel: No measured spl data found; skipping it")
 
@@ -331,6 +635,8 @@ class VerifitModel:
                 value_vars=list(self.targets.columns[3:])
             )
             self.targets_long.rename(columns={'variable': 'condition'}, inplace=True)
+            self.targets_long = self.targets_long.astype(
+                {'filename': 'category', 'condition': 'category'})
         except AttributeError:
             print("verifitmodel: No target data found; skipping it")
 
@@ -342,6 +648,8 @@ class VerifitModel:
                 value_vars=list(self.aided_sii.columns[2:])
             )
             self.aided_sii_long.rename(columns={'variable': 'condition'}, inplace=True)
+            self.aided_sii_long = self.aided_sii_long.astype(
+                {'filename': 'category', 'condition': 'category'})
         except AttributeError:
             print("verifitmodel: No aided SII data found; skipping it")
 
@@ -353,26 +661,35 @@ class VerifitModel:
         # Get data in long format
         self.long_format()
 
-        # Prepare data for concatenating based on index
-        # Measured SPLs
-        m = self.measured_long.copy()
-        m.set_index(['filename', 'frequency', 'condition'], inplace=True)
-
-        # Target SPLs
-        t = self.targets_long.copy()
-        t.set_index(['filename', 'frequency', 'condition'], inplace=True)
-
-        # Merge dfs
-        self.diffs = m.merge(t['value'], left_index=True, right_index=True, how='outer')
-        self.diffs.rename({'value_x': 'measured', 
-                           'value_y': 'target'}, 
-                           axis="columns", 
-                           inplace=True)
-        
-        self.diffs['measured'] = self.diffs['measured'].astype(float)
-        self.diffs['target'] = self.diffs['target'].astype(float)
-        self.diffs['measured-target'] = self.diffs['measured'] - self.diffs['target']
-        self.diffs.reset_index(inplace=True)
+        # Align wide measured and target SPLs on file and frequency,
+        # with the same condition columns in the same order
+        m = self.measured.set_index(['filename', 'frequency'])
+        t = self.targets.set_index(['filename', 'frequency'])
+        rows = m.index.union(t.index).sort_values()
+        conds = m.columns.union(t.columns).drop('data').sort_values()
+        measured = m.reindex(index=rows, columns=conds).to_numpy(dtype=self.dtype)
+        target = t.reindex(index=rows, columns=conds).to_numpy(dtype=self.dtype)
+
+        # Only keep values present in either long format frame
+        keep = (
+            np.outer(rows.isin(m.index), conds.isin(m.columns))
+            | np.outer(rows.isin(t.index), conds.isin(t.columns))
+        ).ravel()
+
+        # Subtract once, then flatten to long format, building the 
+        # categorical columns from codes rather than strings
+        n = len(conds)
+        files = pd.Categorical(rows.get_level_values('filename'))
+        self.diffs = pd.DataFrame({
+            'filename': pd.Categorical.from_codes(
+                np.repeat(files.codes, n)[keep], categories=files.categories),
+            'frequency': np.repeat(rows.get_level_values('frequency'), n)[keep],
+            'condition': pd.Categorical.from_codes(
+                np.tile(np.arange(n), len(rows))[keep], categories=conds),
+            'measured': measured.ravel()[keep],
+            'target': target.ravel()[keep],
+            'measured-target': (measured - target).ravel()[keep]
+        })
 
 
     def export(self, data, title):
@@ -386,18 +703,10 @@ class VerifitModel:
     ######################
     # Plotting Functions #
     ######################
-    def _set_up_plot(self):
-        """ Create empty plotting space for measured-target diffs
+    def _set_up_plot(self, ylabel="Difference (dB SPL)"):
+        """ Create empty plotting space for measured-target diffs, 
+            or for other per-condition curves with YLABEL.
         """
-        # Set style
-        plt.style.use('seaborn-v0_8')
-
-        plt.rc('font', size=16)
-        plt.rc('axes', titlesize=14)
-        plt.rc('axes', labelsize=14)
-        plt.rc('xtick', labelsize=14)
-        plt.rc('ytick', labelsize=14)
-
         # Create ticks and labels
         kHz = [x/1000 for x in self.desired_freqs]
 
@@ -410,14 +719,15 @@ class VerifitModel:
         # Create figure and axes
         rows = 3
         cols = 2
-        self.fig, self.axs = plt.subplots(nrows=rows, ncols=cols)
+        self.fig, self.axs = plt.subplots(nrows=rows, ncols=cols, 
+                                          constrained_layout=True)
 
         for col, side in enumerate(sides):
             counter = 0
             for row in range(0, rows):
                 self.axs[row, col].set(
                     #title=side + ': ' + conds[counter].capitalize(),
-                    ylabel="Difference (dB SPL)",
+                    ylabel=ylabel,
                     xlim=([min(self.desired_freqs)-30, max(self.desired_freqs)+30]),
                     xscale='log',
                     xticks=self.desired_freqs,
@@ -430,6 +740,7 @@ class VerifitModel:
             self.axs[2, ii].set_xlabel('Frequency (kHz)')
 
 
+    @styled(_RC)
     def plot_diff_from_nalnl2(self, **kwargs):
         """ Plot the individual differences between measured and 
             target SPLs.
@@ -448,6 +759,13 @@ class VerifitModel:
                 -If there is only one condition, then there is only one 
                     plot that is displayed (and filled)
             6. Repeat step 5 for the opposite side
+
+            KWARGS:
+                show: 'y' to display the plot (default 'n')
+                save: 'y' to save the plot to diffs.png (default 'n')
+                calc: Overlay the RMS ('rms'), arithmetic mean 
+                    ('mean') or both ('both') of the differences 
+                    at each frequency (default 'n' for neither)
         """
         # Assign values from kwargs
         if "show" in kwargs:
@@ -485,37 +803,67 @@ class VerifitModel:
         conds_right = [x for x in conds_all if 'right' in x and 'mpo' not in x]
         conds_left = [x for x in conds_all if 'left' in x and 'mpo' not in x]
 
-        # LEFT PLOTS
-        # Loop through each filename
-        for file in self.diffs.filename.unique():
-            # Loop through each LEFT condition
-            for ii, cond in enumerate(conds_left):
-                # Grab subject-specific data
-                temp = self.diffs[(self.diffs['filename']==file) & 
-                                  (self.diffs['condition']==cond)
-                ]
-                # Set subplot title
-                self.axs[ii, 0].set(title=f"{cond[0:4].capitalize()}: " + 
-                                    f"{cond[-2:]}"
+        # Group differences by file and condition once for lookup
+        grouped = self.diffs.groupby(['filename', 'condition'], 
+                                     sort=False, observed=True)
+        files = self.diffs['filename'].unique()
+
+        # Set subplot titles: left conditions in column 0, 
+        # right conditions in column 1
+        side_conds = [conds_left, conds_right]
+        for col, conds in enumerate(side_conds):
+            for ii, cond in enumerate(conds):
+                self.axs[ii, col].set(title=f"{cond[:-2].capitalize()}: " + 
+                                      f"{cond[-2:]}"
                 )
-                # Plot condition data in subplot
-                self.axs[ii, 0].plot(temp['frequency'], temp['measured-target'])
-
-        # RIGHT PLOTS
-        # Loop through each filename
-        for file in self.diffs.filename.unique():
-            # Loop through each RIGHT condition
-            for ii, cond in enumerate(conds_right):
-                # Grab subject-specific data
-                temp = self.diffs[(self.diffs['filename']==file) & 
-                                  (self.diffs['condition']==cond)
-                ]
-                # Set subplot title
-                self.axs[ii, 1].set(title=f"{cond[0:5].capitalize()}: " + 
-                                    f"{cond[-2:]}"
-                )
-                # Plot condition data in subplot
-                self.axs[ii, 1].plot(temp['frequency'], temp['measured-target'])
+
+        # Plot both sides in one pass over each filename
+        for file in files:
+            for col, conds in enumerate(side_conds):
+                for ii, cond in enumerate(conds):
+                    # Grab subject-specific data
+                    temp = grouped.get_group((file, cond))
+                    # Plot condition data in subplot
+                    self.axs[ii, col].plot(temp['frequency'], temp['measured-target'])
+
+        if calc in ['rms', 'mean', 'both']:
+            ######################
+            # Plot RMS and Means #
+            ######################
+            # Marker size for RMS points
+            rms_msize = 8
+
+            # Calculate RMS and arithmetic means for each condition 
+            # and frequency in one pass, then plot each condition
+            stats = _diff_stats(self.diffs)
+            for col, conds in enumerate(side_conds):
+                for ii, cond in enumerate(conds):
+                    cond_stats = stats.loc[cond]
+
+                    if (calc == 'rms') or (calc == 'both'):
+                        # Plot RMS
+                        self.axs[ii, col].plot(
+                            cond_stats.index, 
+                            cond_stats['rms'], 
+                            'ko',
+                            markersize=rms_msize,
+                            label='RMS'
+                            )
+
+                    if (calc == 'mean') or (calc == 'both'):
+                        # Plot arithmetic mean
+                        self.axs[ii, col].plot(
+                            cond_stats.index, 
+                            cond_stats['mean'],
+                            linewidth=7,
+                            color='red',
+                            ls='dotted',
+                            label='Arithmetic Mean'
+                            )
+
+                    legend = self.axs[ii, col].legend(frameon=True)
+                    legend.get_frame().set_edgecolor('k')
+                    legend.get_frame().set_linewidth(2.0)
 
         # Check for save instructions
         if save == 'y':
@@ -528,127 +876,52 @@ class VerifitModel:
         # Close plot to avoid overflow with multiple calls
         plt.close()
 
-        # if calc:
-        #     ######################
-        #     # Plot RMS and Means #
-        #     ######################
-        #     # Calculate and plot RMS and arithmetic means for each frequency and level
-        #     # Get values at all freqs for a single level
-        #     for ii in range(1,self.num_curves+1):
-
-        #         ###################
-        #         # Multiple Curves #
-        #         ###################
-        #         if self.num_curves > 1:
-        #             # LEFT #
-        #             # Filter diffs by level
-        #             temp = data[data['level']=='L' + str(ii)]
-        #             # Calculate RMS at each freq
-        #             rms_by_freq = temp.groupby(['freq'])['measured-target'].apply(self.rms)
-        #             # Calculate arithmetic mean at each freq
-        #             means_by_freq = temp.groupby(['freq'])['measured-target'].apply(np.mean)
-
-        #             if (calc == 'rms') or (calc == 'both'):
-        #                 # Plot RMS
-        #                 self.axs[ii-1,0].plot(
-        #                     temp['freq'].unique(), 
-        #                     rms_by_freq, 
-        #                     'ko',
-        #                     markersize=rms_msize,
-        #                     label='RMS'
-        #                     )
-
-        #             if (calc=='mean') or (calc=='both'):
-        #                 # Plot arithmetic mean
-        #                 self.axs[ii-1,0].plot(
-        #                     temp['freq'].unique(), 
-        #                     means_by_freq,
-        #                     linewidth=7,
-        #                     color='red',
-        #                     ls='dotted',
-        #                     label='Arithmetic Mean'
-        #                     )
-
-        #             # RIGHT #
-        #             # Filter diffs by level
-        #             temp = data[data['level']=='R' + str(ii)]
-        #             # Calculate RMS at each freq
-        #             rms_by_freq = temp.groupby(['freq'])['measured-target'].apply(self.rms)
-        #             # Calculate arithmetic mean at each freq
-        #             means_by_freq = temp.groupby(['freq'])['measured-target'].apply(np.mean)
-
-        #             if (calc == 'rms') or (calc == 'both'):
-        #                 # Plot RMS
-        #                 self.axs[ii-1,1].plot(
-        #                     temp['freq'].unique(), 
-        #                     rms_by_freq, 
-        #                     'ko',
-        #                     markersize=rms_msize,
-        #                     label='RMS'
-        #                     )
-
-        #             if (calc == 'mean') or (calc == 'both'):
-        #                 # Plot arithmetic mean
-        #                 self.axs[ii-1,1].plot(
-        #                     temp['freq'].unique(), 
-        #                     means_by_freq,
-        #                     linewidth=7,
-        #                     color='red',
-        #                     ls='dotted',
-        #                     label='Arithmetic Mean'
-        #                     )
-
-        #             #leg_left = self.axs[ii-1,0].legend(frameon=True, loc='center', bbox_to_anchor=(0.5, -0.10))
-        #             #leg_right = self.axs[ii-1,1].legend(frameon=True, loc='center', bbox_to_anchor=(0.5, -0.10))
-        #             leg_left = self.axs[ii-1,0].legend(frameon=True)
-        #             leg_right = self.axs[ii-1,1].legend(frameon=True)
-        #             for legend in [leg_left, leg_right]:
-        #                 legend.get_frame().set_edgecolor('k')
-        #                 legend.get_frame().set_linewidth(2.0)
-
-
-    def plot_ind_measured_spls(self, title=None, **kwargs):
-        """ THIS HAS NOT BEEN UPDATED - BROKEN OR BUGGY.
+
+    @styled(_RC)
+    def plot_ind_measured_spls(self, title=None):
+        """ Plot the measured SPLs for each file, with the grand 
+            average of each condition as black points. Left 
+            conditions are in the left column and right conditions 
+            in the right column.
         """
-        labels = kwargs
         self.long_format()
-        self._set_up_plot(**labels)
+        self._set_up_plot(ylabel="Measured (dB SPL)")
 
         if not title:
             self.fig.suptitle('Measured SPLs')
         else:
             self.fig.suptitle(title)
 
+        # Y limits from all measured values, computed once
+        ymin = self.measured_long['value'].min() - 5
+        ymax = self.measured_long['value'].max() + 5
+
+        # Get left and right conditions (no MPO) for each column
+        conds_all = self.measured_long['condition'].unique()
+        side_conds = [
+            [x for x in conds_all if 'left' in x and 'mpo' not in x],
+            [x for x in conds_all if 'right' in x and 'mpo' not in x]
+        ]
+
+        # Group measured SPLs by file and condition once for lookup
+        grouped = self.measured_long.groupby(['filename', 'condition'], 
+                                             sort=False, observed=True)
+
         # Plot the individual data
         for file in self.measured_long['filename'].unique():
-            for ii in range(1, self.num_curves+1):
-                temp = self.measured_long[(self.measured_long['filename']==file) & (self.measured_long['level']=='L' + str(ii))]
-                print(temp)
-                self.axs[ii-1,0].plot(temp['freq'], temp['value'])
-                self.axs[ii-1,0].axhline(y=0, color='k')
-                self.axs[ii-1,0].set_ylim(
-                    np.min(self.measured_long['value']+(-5)),
-                    np.max(self.measured_long['value']+5)
-                ) 
-
-                temp = self.measured_long[(self.measured_long['filename']==file) & (self.measured_long['level']=='R' + str(ii))]
-                self.axs[ii-1,1].plot(temp['freq'], temp['value'])
-                self.axs[ii-1,1].axhline(y=0, color='k')
-                self.axs[ii-1,1].set_ylim(
-                    np.min(self.measured_long['value']+(-5)),
-                    np.max(self.measured_long['value']+5)
-                )
+            for col, conds in enumerate(side_conds):
+                for ii, cond in enumerate(conds):
+                    temp = grouped.get_group((file, cond))
+                    self.axs[ii, col].plot(temp['frequency'], temp['value'])
+                    self.axs[ii, col].axhline(y=0, color='k')
+                    self.axs[ii, col].set_ylim(ymin, ymax)
             
-        # Calculate and plot grand average curve for each level
-        # Get values at all freqs for a single level
-        for ii in range(1, self.num_curves+1):
-                # Filter diffs by level
-                temp = self.measured_long[self.measured_long['level']=='L' + str(ii)]
-                vals_by_freq = temp.groupby(['freq'])['value'].apply(np.mean)
-                self.axs[ii-1,0].plot(temp['freq'].unique(), vals_by_freq, 'ko')
-
-                temp = self.measured_long[self.measured_long['level']=='R' + str(ii)]
-                vals_by_freq = temp.groupby(['freq'])['value'].apply(np.mean)
-                self.axs[ii-1,1].plot(temp['freq'].unique(), vals_by_freq, 'ko')
+        # Calculate and plot grand average curve for each condition
+        vals_by_freq = self.measured_long.groupby(
+            ['condition', 'frequency'], observed=True)['value'].mean()
+        for col, conds in enumerate(side_conds):
+            for ii, cond in enumerate(conds):
+                cond_vals = vals_by_freq.loc[cond]
+                self.axs[ii, col].plot(cond_vals.index, cond_vals, 'ko')
 
         plt.show()
@@ -1,22 +1,26 @@
+import numpy as np
 import pandas as pd
-import xml.etree.ElementTree as ET
+try:
+    from lxml import etree as ET
+    parser = ET.XMLParser(remove_blank_text=True)
+except ImportError:
+    import xml.etree.ElementTree as ET
+    parser = None
 
 
 LEVELS = ['soft50', 'soft55', 'avg60', 'avg65', 'avg70', 'loud75', 'loud80']
 test_type = 'rear'
 
-tree = ET.parse('./P0136_BestFit.xml')
+tree = ET.parse('./P0136_BestFit.xml', parser)
 root = tree.getroot()
 
 # Get 12th octave freqs
 freqs = root.find("./test[@name='frequencies']/data[@name='12ths']").text
-freqs = freqs.split()
-freqs_12oct = [int(float(freq)) for freq in freqs]
+freqs_12oct = np.fromstring(freqs, sep=' ', dtype=np.float64).astype(np.int32)
 
 # Get audiometric freqs
 freqs = root.find("./test[@name='frequencies']/data[@name='audiometric']").text
-freqs = freqs.split()[:-2]
-freqs_audio = [int(float(freq)) for freq in freqs]
+freqs_audio = np.fromstring(freqs, sep=' ', dtype=np.float64).astype(np.int32)[:-2]
 
 
 #################
@@ -30,18 +34,27 @@ target_dict = {}
 key_dict = {}
 
 sides = ['left', 'right']
+
+# Map numbered speech curve text to its test number, once per side
+curve_nums = {side: {} for side in sides}
+for side in sides:
+    for num in [1,2,3,4]:
+        curve = root.find(f"./test[@side='{side}']/data[@internal='map_{test_type}spl{num}']")
+        if curve is not None:
+            curve_nums[side][curve.text] = num
+
 # Speech Signal
 for item in LEVELS:
     for side in sides:
         try:
             # Get spl values as list
             vals = root.find(f"./test[@side='{side}']/data[@stim_level='{item}']").text
-            spl_dict[side + item[-2:]] = vals.split()
+            spl_dict[side + item[-2:]] = np.fromstring(vals.replace('_', 'nan'), sep=' ', dtype=np.float64)
 
             # Get speech test number (to match to target test number)
-            for num in [1,2,3,4]:
-                if vals == root.find(f"./test[@side='{side}']/data[@internal='map_{test_type}spl{num}']").text:
-                    key_dict[item] = f'map_{test_type}_targetspl{str(num)}'
+            num = curve_nums[side].get(vals)
+            if num is not None:
+                key_dict[item] = f'map_{test_type}_targetspl{num}'
 
         except AttributeError as e:
             pass
@@ -51,7 +64,7 @@ for item in LEVELS:
 for side in sides:
     try:
         vals = root.find(f"./test[@side='{side}']/data[@stim_type='mpo']").text
-        spl_dict[side + 'mpo'] = vals.split()
+        spl_dict[side + 'mpo'] = np.fromstring(vals.replace('_', 'nan'), sep=' ', dtype=np.float64)
     except AttributeError as e:
         print(f"No data for {side} MPO")
 
@@ -71,13 +84,12 @@ for key, value in key_dict.items():
     for side in sides:
         try:
             vals = root.find(f"./test[@side='{side}']/data[@internal='{value}']").text
-            target_dict[side + key[-2:]] = vals.split()[:-2]
+            target_dict[side + key[-2:]] = np.fromstring(vals.replace('_', 'nan'), sep=' ', dtype=np.float64)[:-2]
         except AttributeError as e:
             print(f"No data for {key, '->', value}")
 
 targets = pd.DataFrame(target_dict)
 targets.insert(loc=0, column='frequency', value=freqs_audio)
-targets.apply(pd.to_numeric, errors='ignore')
 print(f'\nTarget Values')
 print(targets)
 